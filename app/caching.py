@@ -0,0 +1,44 @@
+"""Small in-process caches used to avoid re-downloading unchanged data."""
+
+from collections import OrderedDict
+from typing import Any
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Minimal LRU mapping; oldest entries are evicted past maxsize."""
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._entries: OrderedDict[Any, Any] = OrderedDict()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        value = self._entries.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+
+class ConditionalCache:
+    """LRU of (etag, body) pairs keyed by URL, for conditional HTTP GETs.
+
+    A hit supplies the ETag to send as If-None-Match; a 304 answer means the
+    cached body is still current and costs GitHub zero rate-limit points.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self._lru = LRUCache(maxsize)
+
+    def get(self, key: str) -> tuple[str | None, Any] | None:
+        return self._lru.get(key)
+
+    def put(self, key: str, etag: str | None, body: Any) -> None:
+        self._lru.put(key, (etag, body))
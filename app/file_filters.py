@@ -0,0 +1,79 @@
+"""Skip rules deciding which repository files are worth considering at all.
+
+Shared by the tree parser (so skipped entries never become RepoFile
+objects) and by the scoring pass in repo_processor.
+"""
+
+SKIP_DIRECTORIES = {
+    "node_modules", ".git", "vendor", "dist", "build", "__pycache__",
+    ".next", ".nuxt", ".tox", ".mypy_cache", ".pytest_cache", ".ruff_cache",
+    "venv", ".venv", "env", ".env", "eggs", ".eggs", "bower_components",
+    "jspm_packages", ".gradle", ".idea", ".vscode", ".vs", "target",
+    "out", "coverage", ".nyc_output", ".cache", "tmp", "temp",
+}
+
+SKIP_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".svg", ".webp",
+    ".mp3", ".mp4", ".avi", ".mov", ".wav", ".flac",
+    ".zip", ".tar", ".gz", ".bz2", ".xz", ".rar", ".7z",
+    ".woff", ".woff2", ".ttf", ".eot", ".otf",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt",
+    ".exe", ".dll", ".so", ".dylib", ".bin", ".o", ".a", ".class",
+    ".pyc", ".pyo", ".wasm", ".map",
+    ".lock", ".sum",
+    ".min.js", ".min.css", ".bundle.js",
+    ".DS_Store",
+}
+
+SKIP_FILENAMES = {
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "Pipfile.lock",
+    "poetry.lock", "composer.lock", "Gemfile.lock", "Cargo.lock",
+    "go.sum", "bun.lockb",
+    ".DS_Store", "Thumbs.db",
+    ".gitattributes",
+}
+
+# Files larger than this are likely generated, data dumps, or vendored code.
+MAX_FILE_SIZE = 500_000
+
+# Single-dot suffixes are a hashed set lookup on the final extension;
+# only the few compound suffixes (.min.js etc.) need a tuple endswith.
+# set.isdisjoint beats a Python-level any() over the path components.
+_SIMPLE_SKIP_EXTS = frozenset(
+    e.lower() for e in SKIP_EXTENSIONS if e.count(".") == 1
+)
+_COMPOUND_SKIP_EXTS = tuple(
+    e.lower() for e in SKIP_EXTENSIONS if e.count(".") > 1
+)
+
+
+def _is_in_skip_directory(path: str) -> bool:
+    return not SKIP_DIRECTORIES.isdisjoint(path.split("/"))
+
+
+def _has_skip_extension(path: str) -> bool:
+    dot = path.rfind(".")
+    if dot == -1:
+        return False
+    if path[dot:].lower() in _SIMPLE_SKIP_EXTS:
+        return True
+    return path.lower().endswith(_COMPOUND_SKIP_EXTS)
+
+
+def _get_filename(path: str) -> str:
+    return path.rsplit("/", 1)[-1]
+
+
+def should_skip_parsed(path: str, parts: list[str], size: int) -> bool:
+    """Skip check for callers that already split the path into components."""
+    return (
+        size > MAX_FILE_SIZE
+        or _has_skip_extension(path)
+        or not SKIP_DIRECTORIES.isdisjoint(parts)
+        or parts[-1] in SKIP_FILENAMES
+    )
+
+
+def should_skip_file(path: str, size: int) -> bool:
+    """True when a blob should never reach scoring or fetching."""
+    return should_skip_parsed(path, path.split("/"), size)
@@ -1,40 +1,194 @@
+import asyncio
 import logging
+import time
 
 import httpx
+import orjson
 from dataclasses import dataclass
+from typing import Any, Callable
+
+from app.caching import ConditionalCache
+from app.file_filters import should_skip_file
 
 GITHUB_API = "https://api.github.com"
 REQUEST_TIMEOUT = 30.0
+POOL_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=50, keepalive_expiry=30.0
+)
 logger = logging.getLogger(__name__)
 
 
+def build_http_client(token: str | None = None) -> httpx.AsyncClient:
+    """Build the HTTP client used for all GitHub traffic.
+
+    HTTP/2 lets the many raw-content downloads multiplex over a single
+    connection, and the keepalive pool avoids re-doing TLS handshakes
+    when the client is shared across requests.
+    """
+    headers = {"Accept": "application/vnd.github.v3+json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return httpx.AsyncClient(
+        headers=headers,
+        timeout=REQUEST_TIMEOUT,
+        follow_redirects=True,
+        http2=True,
+        limits=POOL_LIMITS,
+    )
+
+
 @dataclass
 class RepoFile:
     path: str
     size: int
     download_url: str | None = None
     content: str | None = None
+    sha: str | None = None
+    score: int = 0
 
 
 class GitHubClientError(Exception):
     pass
 
 
+class _TokenBucket:
+    """Minimal asyncio token bucket: refills at `rate` tokens/sec up to `burst`.
+
+    Single-threaded asyncio means the refill/decrement sequence has no await
+    in between, so no lock is needed.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self._burst, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+# Process-wide limiters so concurrent summarize requests share one budget.
+# api.github.com is gated conservatively to stay clear of GitHub's secondary
+# rate limits; raw content downloads get a looser bucket.
+_API_BUCKET = _TokenBucket(rate=10.0, burst=20)
+_RAW_BUCKET = _TokenBucket(rate=50.0, burst=100)
+
+MAX_RATE_LIMIT_SLEEP = 30.0
+
+# Beyond this the whole-repo tarball stops being cheaper than fetching the
+# selected files individually.
+TARBALL_MAX_BYTES = 5 * 1024 * 1024
+
+# Per-file download cap: the context builder keeps at most ~15k characters
+# per file, so anything past this would be decoded and thrown away.
+MAX_CONTENT_BYTES = 64 * 1024
+
+# Process-wide ETag cache: repeat summarize calls for an unchanged repo turn
+# into cheap 304 revalidations instead of full downloads.
+_RESPONSE_CACHE = ConditionalCache(maxsize=2048)
+
+
+def _retry_delay(resp: httpx.Response) -> float | None:
+    """Delay (seconds) suggested by GitHub's rate-limit headers, if any."""
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), MAX_RATE_LIMIT_SLEEP)
+        except ValueError:
+            return None
+    if resp.headers.get("X-RateLimit-Remaining") == "0":
+        reset = resp.headers.get("X-RateLimit-Reset")
+        if reset is not None:
+            try:
+                return min(max(float(reset) - time.time(), 0.0), MAX_RATE_LIMIT_SLEEP)
+            except ValueError:
+                return None
+    return None
+
+
 class GitHubClient:
-    def __init__(self, token: str | None = None):
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        if token:
-            headers["Authorization"] = f"Bearer {token}"
-        self._client = httpx.AsyncClient(
-            headers=headers, timeout=REQUEST_TIMEOUT, follow_redirects=True
-        )
+    def __init__(
+        self, token: str | None = None, client: httpx.AsyncClient | None = None
+    ):
+        # Prefer an injected long-lived client (see the app lifespan); only
+        # build (and own) a private one when running standalone.
+        self._owns_client = client is None
+        self._client = client if client is not None else build_http_client(token)
+        self._has_token = token is not None
 
     async def close(self):
-        await self._client.aclose()
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """Rate-limited GET; sleeps and retries once on a throttled response."""
+        # Blob downloads are content traffic, so they share the looser
+        # content bucket even though they hit the API host.
+        is_api = url.startswith(GITHUB_API) and "/git/blobs/" not in url
+        bucket = _API_BUCKET if is_api else _RAW_BUCKET
+        await bucket.acquire()
+        resp = await self._client.get(url, **kwargs)
+        logger.debug(
+            "GET %s -> %d (content-encoding: %s)",
+            url,
+            resp.status_code,
+            resp.headers.get("Content-Encoding", "identity"),
+        )
+        if resp.status_code in (403, 429):
+            delay = _retry_delay(resp)
+            if delay is not None:
+                logger.warning(
+                    "GitHub throttled request (HTTP %d); retrying in %.1fs",
+                    resp.status_code,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+                await bucket.acquire()
+                resp = await self._client.get(url, **kwargs)
+        return resp
+
+    async def _get_cached(
+        self,
+        url: str,
+        parse: Callable[[httpx.Response], Any],
+        extra_headers: dict[str, str] | None = None,
+    ) -> tuple[httpx.Response, Any | None]:
+        """GET with ETag revalidation against the process-wide cache.
+
+        Returns the response plus the parsed body, which is the cached copy
+        when GitHub answers 304 Not Modified and None on any other non-200.
+        """
+        cached = _RESPONSE_CACHE.get(url)
+        headers = dict(extra_headers) if extra_headers else {}
+        if cached and cached[0]:
+            headers["If-None-Match"] = cached[0]
+        resp = await self._get(url, headers=headers or None)
+        if resp.status_code == 304 and cached is not None:
+            logger.debug("Cache revalidated (304): %s", url)
+            return resp, cached[1]
+        if resp.status_code != 200:
+            return resp, None
+        body = parse(resp)
+        etag = resp.headers.get("ETag")
+        if etag:
+            _RESPONSE_CACHE.put(url, etag, body)
+        return resp, body
 
     async def get_default_branch(self, owner: str, repo: str) -> str:
         url = f"{GITHUB_API}/repos/{owner}/{repo}"
-        resp = await self._client.get(url)
+        resp, data = await self._get_cached(url, lambda r: orjson.loads(r.content))
+        if data is not None:
+            return data["default_branch"]
         if resp.status_code == 404:
             raise GitHubClientError(
                 f"Repository '{owner}/{repo}' not found. "
@@ -43,20 +197,25 @@ class GitHubClient:
         if resp.status_code == 403:
             raise GitHubClientError("GitHub API rate limit exceeded. Try again later.")
         resp.raise_for_status()
-        return resp.json()["default_branch"]
+        raise GitHubClientError(
+            f"Unexpected response fetching repository '{owner}/{repo}'."
+        )
 
     async def get_repo_tree(
         self, owner: str, repo: str, branch: str
     ) -> list[RepoFile]:
         url = f"{GITHUB_API}/repos/{owner}/{repo}/git/trees/{branch}?recursive=1"
-        resp = await self._client.get(url)
-        if resp.status_code == 404:
+        resp, data = await self._get_cached(url, lambda r: orjson.loads(r.content))
+        if data is None:
+            if resp.status_code == 404:
+                raise GitHubClientError(
+                    f"Repository '{owner}/{repo}' not found. "
+                    "Make sure it exists and is public."
+                )
+            resp.raise_for_status()
             raise GitHubClientError(
-                f"Repository '{owner}/{repo}' not found. "
-                "Make sure it exists and is public."
+                f"Unexpected response fetching tree for '{owner}/{repo}'."
             )
-        resp.raise_for_status()
-        data = resp.json()
 
         if data.get("truncated"):
             logger.warning(
@@ -67,31 +226,97 @@ class GitHubClient:
                 branch,
             )
 
+        # Apply the skip rules while parsing: on big trees the vast majority
+        # of blobs (node_modules, binaries, lockfiles) never become RepoFile
+        # objects at all.
         files: list[RepoFile] = []
         tree = data.get("tree", [])
+        # With a token, download blobs from the API host: they multiplex on
+        # the already-open api.github.com HTTP/2 connection and are keyed by
+        # immutable sha. Unauthenticated API quota is only 60 req/h, so
+        # tokenless requests stay on raw.githubusercontent.com.
+        use_blobs_api = self._has_token
         for item in tree:
             if item["type"] != "blob":
                 continue
-            files.append(
-                RepoFile(
-                    path=item["path"],
-                    size=item.get("size", 0),
-                    download_url=(
-                        f"https://raw.githubusercontent.com/"
-                        f"{owner}/{repo}/{branch}/{item['path']}"
-                    ),
+            path = item["path"]
+            size = item.get("size", 0)
+            if should_skip_file(path, size):
+                continue
+            sha = item.get("sha")
+            if use_blobs_api and sha:
+                download_url = f"{GITHUB_API}/repos/{owner}/{repo}/git/blobs/{sha}"
+            else:
+                download_url = (
+                    f"https://raw.githubusercontent.com/"
+                    f"{owner}/{repo}/{branch}/{path}"
                 )
+            files.append(
+                RepoFile(path=path, size=size, download_url=download_url, sha=sha)
             )
         return files
 
+    async def fetch_tarball(
+        self, owner: str, repo: str, branch: str, max_bytes: int = TARBALL_MAX_BYTES
+    ) -> bytes | None:
+        """Download the repo tarball, or None on error or oversize.
+
+        Streams the body so an oversized archive is abandoned early instead
+        of buffered whole.
+        """
+        url = f"{GITHUB_API}/repos/{owner}/{repo}/tarball/{branch}"
+        await _RAW_BUCKET.acquire()
+        try:
+            async with self._client.stream("GET", url) as resp:
+                if resp.status_code != 200:
+                    return None
+                buf = bytearray()
+                async for chunk in resp.aiter_bytes():
+                    buf.extend(chunk)
+                    if len(buf) > max_bytes:
+                        logger.debug(
+                            "Tarball for %s/%s exceeds %d bytes; falling back "
+                            "to per-file fetches",
+                            owner,
+                            repo,
+                            max_bytes,
+                        )
+                        return None
+                return bytes(buf)
+        except httpx.HTTPError:
+            return None
+
     async def fetch_file_content(self, file: RepoFile) -> str | None:
         if not file.download_url:
             return None
+        url = file.download_url
+        cached = _RESPONSE_CACHE.get(url)
+        if cached is not None and "/git/blobs/" in url:
+            # Blob URLs are addressed by content sha, so a hit can never be
+            # stale — return it without even a revalidation round-trip.
+            return cached[1]
+        headers = {"Accept": "application/vnd.github.raw"}
+        if cached and cached[0]:
+            headers["If-None-Match"] = cached[0]
+        await _RAW_BUCKET.acquire()
         try:
-            resp = await self._client.get(file.download_url)
-            if resp.status_code != 200:
-                return None
-            resp.encoding = "utf-8"
-            return resp.text
-        except (httpx.HTTPError, UnicodeDecodeError):
+            # Stream the body and stop past the cap: the context builder
+            # keeps only the head of each file, so there is no point
+            # downloading or decoding the rest of a multi-MB file.
+            async with self._client.stream("GET", url, headers=headers) as resp:
+                if resp.status_code == 304 and cached is not None:
+                    return cached[1]
+                if resp.status_code != 200:
+                    return None
+                buf = bytearray()
+                async for chunk in resp.aiter_bytes():
+                    buf.extend(chunk)
+                    if len(buf) >= MAX_CONTENT_BYTES:
+                        break
+                text = buf[:MAX_CONTENT_BYTES].decode("utf-8", "replace")
+                etag = resp.headers.get("ETag")
+                if etag:
+                    _RESPONSE_CACHE.put(url, etag, text)
+                return text
+        except httpx.HTTPError:
             return None
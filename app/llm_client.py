@@ -1,13 +1,19 @@
+import hashlib
 import json
 import logging
 
 from openai import AsyncOpenAI
 
+from app.caching import LRUCache
 from app.config import DEFAULT_NEBIUS_API_BASE, DEFAULT_NEBIUS_MODEL
 from app.models import SummarizeResponse
 
 logger = logging.getLogger(__name__)
 
+# Summaries keyed by a hash of (model, prompt): an unchanged repo produces an
+# identical prompt, so repeat requests skip the LLM call entirely.
+_SUMMARY_CACHE: LRUCache = LRUCache(maxsize=256)
+
 SYSTEM_PROMPT = """\
 You are a software project analyst. You will receive:
 - the repository tree structure (or a compact summary for large repos)
@@ -72,10 +78,17 @@ class LLMClient:
         user_prompt = USER_PROMPT_TEMPLATE.format(
             owner=owner, repo=repo, context=context
         )
+        cache_key = hashlib.sha256(
+            f"{self._model}\n{user_prompt}".encode()
+        ).hexdigest()
+        cached = _SUMMARY_CACHE.get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached summary for %s/%s", owner, repo)
+            return cached
         max_json_retries = 3
         for attempt in range(1, max_json_retries + 1):
             try:
-                response = await self._client.chat.completions.create(
+                stream = await self._client.chat.completions.create(
                     model=self._model,
                     extra_body={"thinking": {"type": "disabled"}},
                     messages=[
@@ -83,23 +96,33 @@ class LLMClient:
                         {"role": "user", "content": user_prompt},
                     ],
                     temperature=0.2,
-                    max_tokens=800,
+                    max_tokens=600,
                     response_format={"type": "json_object"},
+                    stream=True,
                 )
+                # Consuming the stream yields control back to the event loop
+                # between tokens, so other requests progress while the model
+                # generates instead of blocking for the full completion.
+                chunks: list[str] = []
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        chunks.append(chunk.choices[0].delta.content)
             except Exception as e:
                 logger.error("LLM API call failed: %s", e)
                 raise LLMError(f"LLM API call failed: {e}") from e
 
-            raw = response.choices[0].message.content
+            raw = "".join(chunks)
             try:
                 if not raw:
                     raise ValueError("LLM returned an empty response")
                 data = json.loads(raw)
-                return SummarizeResponse(
+                result = SummarizeResponse(
                     summary=data.get("summary", ""),
                     technologies=data.get("technologies", []),
                     structure=data.get("structure", ""),
                 )
+                _SUMMARY_CACHE.put(cache_key, result)
+                return result
             except Exception as e:
                 if attempt == max_json_retries:
                     logger.error(
@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import os
+from contextlib import asynccontextmanager
 
 from fastapi.responses import JSONResponse
 
@@ -7,7 +9,7 @@ from app.config import (
     DEFAULT_NEBIUS_API_BASE,
     DEFAULT_NEBIUS_MODEL,
 )
-from app.github_client import GitHubClient, GitHubClientError
+from app.github_client import GitHubClient, GitHubClientError, build_http_client
 from app.llm_client import LLMClient, LLMError
 from app.models import ErrorResponse, SummarizeRequest, SummarizeResponse
 from app.repo_processor import collect_repo_context
@@ -24,10 +26,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One shared HTTP/2 client for all GitHub traffic, so repeated
+    # summarize calls reuse warm connections instead of re-doing TLS.
+    app.state.http_client = build_http_client(token=os.environ.get("GITHUB_TOKEN"))
+    yield
+    await app.state.http_client.aclose()
+
+
 app = FastAPI(
     title="GitHub Repository Summarizer",
     description="Analyzes a public GitHub repository and returns an LLM-generated summary.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -36,7 +48,14 @@ def _is_llm_auth_error(error: Exception) -> bool:
     return any(token in msg for token in ("authenticate", "authentication", "unauthorized"))
 
 
+# Cached LLM client: constructing one per request would also rebuild the
+# AsyncOpenAI connection pool, losing keepalive between summarize calls.
+_llm_client: LLMClient | None = None
+_llm_client_config: tuple[str, str, str] | None = None
+
+
 def _get_llm_client() -> LLMClient:
+    global _llm_client, _llm_client_config
     api_key = os.environ.get("NEBIUS_API_KEY", "")
     if not api_key:
         raise HTTPException(
@@ -48,7 +67,11 @@ def _get_llm_client() -> LLMClient:
         )
     base_url = os.environ.get("NEBIUS_API_BASE", DEFAULT_NEBIUS_API_BASE)
     model = os.environ.get("NEBIUS_MODEL", DEFAULT_NEBIUS_MODEL)
-    return LLMClient(api_key=api_key, base_url=base_url, model=model)
+    config = (api_key, base_url, model)
+    if _llm_client is None or _llm_client_config != config:
+        _llm_client = LLMClient(api_key=api_key, base_url=base_url, model=model)
+        _llm_client_config = config
+    return _llm_client
 
 
 @app.post(
@@ -66,14 +89,25 @@ async def summarize(request: SummarizeRequest):
     logger.info("Summarizing repository: %s/%s", owner, repo)
 
     github_token = os.environ.get("GITHUB_TOKEN")
-    github = GitHubClient(token=github_token)
+    github = GitHubClient(
+        token=github_token,
+        client=getattr(app.state, "http_client", None),
+    )
     llm = _get_llm_client()
 
     try:
-        branch = await github.get_default_branch(owner, repo)
+        # Fetch the tree speculatively against HEAD (always the default
+        # branch) so both round-trips overlap instead of serializing.
+        branch, files = await asyncio.gather(
+            github.get_default_branch(owner, repo),
+            github.get_repo_tree(owner, repo, "HEAD"),
+            return_exceptions=True,
+        )
+        if isinstance(branch, BaseException):
+            raise branch
+        if isinstance(files, BaseException):
+            raise files
         logger.info("Default branch: %s", branch)
-
-        files = await github.get_repo_tree(owner, repo, branch)
         if not files:
             return JSONResponse(
                 status_code=400,
@@ -83,7 +117,7 @@ async def summarize(request: SummarizeRequest):
             )
         logger.info("Found %d files in repo tree", len(files))
 
-        context = await collect_repo_context(github, files)
+        context = await collect_repo_context(github, owner, repo, branch, files)
         logger.info("Assembled context: %d characters", len(context))
 
     except GitHubClientError as e:
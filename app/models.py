@@ -1,6 +1,10 @@
 from pydantic import BaseModel, field_validator
 import re
 
+_GITHUB_URL_RE = re.compile(
+    r"https?://github\.com/(?P<owner>[A-Za-z0-9_.-]+)/(?P<repo>[A-Za-z0-9_.-]+)"
+)
+
 
 class SummarizeRequest(BaseModel):
     github_url: str
@@ -9,8 +13,7 @@ class SummarizeRequest(BaseModel):
     @classmethod
     def validate_github_url(cls, v: str) -> str:
         v = v.strip().rstrip("/")
-        pattern = r"^https?://github\.com/[A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+$"
-        if not re.match(pattern, v):
+        if not _GITHUB_URL_RE.fullmatch(v):
             raise ValueError(
                 "Invalid GitHub repository URL. "
                 "Expected format: https://github.com/owner/repo"
@@ -18,8 +21,8 @@ class SummarizeRequest(BaseModel):
         return v
 
     def parse_owner_repo(self) -> tuple[str, str]:
-        parts = self.github_url.rstrip("/").split("/")
-        return parts[-2], parts[-1]
+        m = _GITHUB_URL_RE.fullmatch(self.github_url)
+        return m.group("owner"), m.group("repo")
 
 
 class SummarizeResponse(BaseModel):
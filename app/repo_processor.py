@@ -1,43 +1,30 @@
 import asyncio
+import hashlib
+import heapq
+import io
 import logging
-from pathlib import PurePosixPath
+import operator
+import tarfile
+from collections import Counter
 
+from app.caching import LRUCache
+from app.file_filters import should_skip_parsed
 from app.github_client import GitHubClient, RepoFile
 
 logger = logging.getLogger(__name__)
 
+# Rendered directory trees keyed by a digest of the path list they were
+# built from, so repeat requests for an unchanged repo skip the render.
+_TREE_CACHE: LRUCache = LRUCache(maxsize=256)
+
 MAX_CONTEXT_CHARS = 80_000
 MAX_FILE_CHARS = 15_000
 MAX_FILES_TO_FETCH = 40
-
-SKIP_DIRECTORIES = {
-    "node_modules", ".git", "vendor", "dist", "build", "__pycache__",
-    ".next", ".nuxt", ".tox", ".mypy_cache", ".pytest_cache", ".ruff_cache",
-    "venv", ".venv", "env", ".env", "eggs", ".eggs", "bower_components",
-    "jspm_packages", ".gradle", ".idea", ".vscode", ".vs", "target",
-    "out", "coverage", ".nyc_output", ".cache", "tmp", "temp",
-}
-
-SKIP_EXTENSIONS = {
-    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".svg", ".webp",
-    ".mp3", ".mp4", ".avi", ".mov", ".wav", ".flac",
-    ".zip", ".tar", ".gz", ".bz2", ".xz", ".rar", ".7z",
-    ".woff", ".woff2", ".ttf", ".eot", ".otf",
-    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt",
-    ".exe", ".dll", ".so", ".dylib", ".bin", ".o", ".a", ".class",
-    ".pyc", ".pyo", ".wasm", ".map",
-    ".lock", ".sum",
-    ".min.js", ".min.css", ".bundle.js",
-    ".DS_Store",
-}
-
-SKIP_FILENAMES = {
-    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "Pipfile.lock",
-    "poetry.lock", "composer.lock", "Gemfile.lock", "Cargo.lock",
-    "go.sum", "bun.lockb",
-    ".DS_Store", "Thumbs.db",
-    ".gitattributes",
-}
+# HTTP/2 multiplexes these as streams on a shared connection, so concurrency
+# is cheap; the client's token buckets remain the throttling chokepoint.
+FETCH_WORKERS = 16
+# Above this many files, one tarball download beats per-file fetches.
+TARBALL_MIN_FILES = 10
 
 HIGH_PRIORITY_FILENAMES = {
     "package.json", "pyproject.toml", "setup.py", "setup.cfg",
@@ -70,119 +57,182 @@ SOURCE_EXTENSIONS = {
 }
 
 
-def _is_in_skip_directory(path: str) -> bool:
-    parts = PurePosixPath(path).parts
-    return any(part in SKIP_DIRECTORIES for part in parts)
-
-
-def _has_skip_extension(path: str) -> bool:
-    lower = path.lower()
-    return any(lower.endswith(ext) for ext in SKIP_EXTENSIONS)
-
-
-def _get_filename(path: str) -> str:
-    return PurePosixPath(path).name
-
-
-def _get_extension(path: str) -> str:
-    return PurePosixPath(path).suffix.lower()
-
+# Category bonuses folded into flat tables: one dict lookup per aspect
+# instead of chained set membership tests. Entries containing a slash
+# (e.g. .github/workflows) match the whole path, never a bare filename.
+_SOURCE_FILE_SCORE = 100
+_PRIORITY_SCORES = {
+    **{n: 800 for n in HIGH_PRIORITY_FILENAMES},
+    **{n: 500 for n in MEDIUM_PRIORITY_FILENAMES},
+}
+_NAME_SCORE = {k: v for k, v in _PRIORITY_SCORES.items() if "/" not in k}
+_PATH_SCORE = {k: v for k, v in _PRIORITY_SCORES.items() if "/" in k}
+_EXT_SCORE = {
+    **{e: 200 for e in CONFIG_EXTENSIONS},
+    **{e: _SOURCE_FILE_SCORE for e in SOURCE_EXTENSIONS},
+}
+_ENTRY_BONUS = {
+    n: 300 for n in ("main", "app", "index", "server", "cli", "__main__", "mod")
+}
 
-def _score_file(file: RepoFile) -> int:
-    """Higher score = higher priority for inclusion."""
-    name = _get_filename(file.path)
-    ext = _get_extension(file.path)
-    depth = len(PurePosixPath(file.path).parts)
 
-    score = 0
+def _score_file(path: str, name: str, ext: str, depth: int, size: int) -> int:
+    """Higher score = higher priority for inclusion.
 
-    if name.upper().startswith("README"):
+    Takes pre-parsed path pieces so the filter pass splits each path
+    exactly once for both skip checks and scoring.
+    """
+    lname = name.lower()
+    if name[:6].upper() == "README":
         score = 2000
-    elif name in HIGH_PRIORITY_FILENAMES:
-        score = 800
-    elif name in MEDIUM_PRIORITY_FILENAMES or file.path in MEDIUM_PRIORITY_FILENAMES:
-        score = 500
-    elif ext in CONFIG_EXTENSIONS:
-        score = 200
-    elif ext in SOURCE_EXTENSIONS:
-        score = 100
+    else:
+        score = _NAME_SCORE.get(name, 0)
+        if not score and depth > 1:
+            score = _PATH_SCORE.get(path, 0)
+        if not score:
+            score = _EXT_SCORE.get(ext, 0)
         # Prefer test files among source files
-        if "test" in name.lower():
+        if score == _SOURCE_FILE_SCORE and "test" in lname:
             score += 50
 
     # Strongly prefer top-level files;
     score -= (depth-1) * 500  # depth 1: 0, depth 2: -500, depth 3: -1000, ...
 
     # Prefer smaller files (they're usually more focused)
-    if file.size < 2000:
+    if size < 2000:
         score += 30
-    elif file.size < 5000:
+    elif size < 5000:
         score += 15
-    elif file.size > 50000:
+    elif size > 50000:
         score -= 50
 
     # Entry-point heuristics
-    entry_names = {"main", "app", "index", "server", "cli", "__main__", "mod"}
-    stem = PurePosixPath(name).stem.lower()
-    if stem in entry_names:
-        score += 300
+    stem = lname[: -len(ext)] if ext else lname
+    score += _ENTRY_BONUS.get(stem, 0)
 
     return score
 
 
-def filter_files(files: list[RepoFile]) -> list[RepoFile]:
-    """Remove files that should be skipped and sort by priority."""
+def analyze_files(
+    files: list[RepoFile], top_k: int | None = None
+) -> tuple[list[RepoFile], list[str]]:
+    """Score files for prioritization and collect tree paths in one pass.
+
+    The tree parser already applies the skip rules, so this mostly just
+    scores and sorts; the re-check keeps direct callers safe. The returned
+    path list covers every file and feeds the directory-tree renderer, so
+    the file list is only walked once. With top_k, only the k best files
+    are selected (heap, O(N log k)) instead of fully sorting.
+    """
     filtered = []
+    file_paths = []
+    skipped = 0
     for f in files:
-        if _is_in_skip_directory(f.path):
-            logger.debug("Skipping file %s because it's in a skip directory", f.path)
-            continue
-        if _has_skip_extension(f.path):
-            logger.debug("Skipping file %s because it has a skip extension", f.path)
-            continue
-        if _get_filename(f.path) in SKIP_FILENAMES:
-            logger.debug("Skipping file %s because it has a skip filename", f.path)
-            continue
-        if f.size > 500_000:
+        file_paths.append(f.path)
+        parts = f.path.split("/")
+        if should_skip_parsed(f.path, parts, f.size):
+            skipped += 1
             continue
+        name = parts[-1]
+        dot = name.rfind(".")
+        ext = name[dot:].lower() if dot > 0 else ""
+        f.score = _score_file(f.path, name, ext, len(parts), f.size)
         filtered.append(f)
-    filtered.sort(key=_score_file, reverse=True)
-    return filtered
-
-
-def _build_tree_full(
-    dirs: set[str], file_paths: list[str], max_lines: int
-) -> list[str]:
-    """Render a full indented directory tree (used when dirs <= 100)."""
-    all_entries = sorted(list(dirs) + file_paths)
-    lines = []
-    for entry in all_entries:
-        depth = entry.count("/")
-        if entry.endswith("/"):
-            depth -= 1
-        indent = "  " * depth
-        name = entry.rstrip("/").split("/")[-1]
-        if entry.endswith("/"):
-            name += "/"
-        lines.append(f"{indent}{name}")
+    if skipped:
+        # One summary record instead of a LogRecord per skipped file.
+        logger.debug("Skipped %d of %d files via skip rules", skipped, len(files))
+    # Scores are computed once above, so the selection key is a C-level
+    # getter either way; nlargest matches sorted(...)[:k] including ties.
+    if top_k is not None and len(filtered) > top_k:
+        filtered = heapq.nlargest(
+            top_k, filtered, key=operator.attrgetter("score")
+        )
+    else:
+        filtered.sort(key=operator.attrgetter("score"), reverse=True)
+    return filtered, file_paths
+
+
+def filter_files(files: list[RepoFile]) -> list[RepoFile]:
+    """Remove files that should be skipped and sort by priority."""
+    return analyze_files(files)[0]
+
+
+def _common_dir_prefix(dirs: list[str], prev_dirs: list[str]) -> int:
+    """Length of the shared leading directory components of two paths."""
+    common = 0
+    limit = min(len(dirs), len(prev_dirs))
+    while common < limit and dirs[common] == prev_dirs[common]:
+        common += 1
+    return common
+
+
+def _count_directories(sorted_paths: list[str]) -> int:
+    """Count distinct directories in one linear pass over sorted paths.
+
+    Paths sharing a directory prefix are adjacent after sorting, so each
+    directory is new exactly once — no prefix set needed.
+    """
+    count = 0
+    prev_dirs: list[str] = []
+    for path in sorted_paths:
+        dirs = path.split("/")[:-1]
+        count += len(dirs) - _common_dir_prefix(dirs, prev_dirs)
+        prev_dirs = dirs
+    return count
+
+
+def _build_tree_full(sorted_paths: list[str], max_lines: int) -> list[str]:
+    """Render a full indented directory tree (used when dirs <= 100).
+
+    Walks the pre-sorted paths once and emits a directory line whenever a
+    path introduces a component its predecessor didn't have.
+    """
+    lines: list[str] = []
+    prev_dirs: list[str] = []
+    for idx, path in enumerate(sorted_paths):
+        parts = path.split("/")
+        dirs = parts[:-1]
+        for depth in range(_common_dir_prefix(dirs, prev_dirs), len(dirs)):
+            lines.append(f"{'  ' * depth}{dirs[depth]}/")
+        lines.append(f"{'  ' * len(dirs)}{parts[-1]}")
+        prev_dirs = dirs
         if len(lines) >= max_lines:
-            lines.append(f"  ... ({len(all_entries) - max_lines} more entries)")
+            remaining = len(sorted_paths) - idx - 1
+            if remaining:
+                lines.append(f"  ... ({remaining} more files)")
             break
     return lines
 
 
+def _suffix_of(name: str) -> str:
+    dot = name.rfind(".")
+    return name[dot:] if dot > 0 else "(no_ext)"
+
+
 def _build_tree_summary(file_paths: list[str], max_lines: int) -> list[str]:
-    """Render a top-level summary tree (used when dirs > 100)."""
-    from collections import Counter
+    """Render a top-level summary tree (used when dirs > 100).
 
-    top_level_dirs: set[str] = set()
+    Aggregates per-top-level-dir suffix counts and sub-directory sets in a
+    single pass rather than re-scanning every path for every directory.
+    """
     top_level_files: list[str] = []
+    # top-level dir -> (suffix counter, set of immediate sub-dirs)
+    agg: dict[str, tuple[Counter, set[str]]] = {}
     for fpath in file_paths:
-        p = PurePosixPath(fpath)
-        if len(p.parts) == 1:
+        top, sep, rest = fpath.partition("/")
+        if not sep:
             top_level_files.append(fpath)
+            continue
+        entry = agg.get(top)
+        if entry is None:
+            entry = (Counter(), set())
+            agg[top] = entry
+        sub, sep, tail = rest.partition("/")
+        if sep:
+            entry[1].add(sub)
+            entry[0][_suffix_of(tail.rsplit("/", 1)[-1])] += 1
         else:
-            top_level_dirs.add(p.parts[0])
+            entry[0][_suffix_of(sub)] += 1
 
     lines = ["[Summary — over 100 directories, showing top level breakdown]"]
 
@@ -194,11 +244,13 @@ def _build_tree_summary(file_paths: list[str], max_lines: int) -> list[str]:
             lines.append(f"  {fpath}")
         if len(sorted_top) > 30:
             remaining = sorted_top[30:]
-            type_counts: Counter = Counter(PurePosixPath(f).suffix or "(no_ext)" for f in remaining)
+            type_counts: Counter = Counter(
+                _suffix_of(f) if "." in f else "(no_ext)" for f in remaining
+            )
             type_str = ", ".join(f"{typ}: {cnt}" for typ, cnt in type_counts.most_common())
             lines.append(f"  ... ({len(remaining)} more: {type_str})")
 
-    sorted_top_level_dirs = sorted(top_level_dirs)
+    sorted_top_level_dirs = sorted(agg)
     if sorted_top_level_dirs:
         lines.append("")
         lines.append("Top-level directories:")
@@ -211,16 +263,7 @@ def _build_tree_summary(file_paths: list[str], max_lines: int) -> list[str]:
             return lines
 
     for d in sorted_top_level_dirs:
-        file_types: Counter = Counter()
-        subdirs: set[str] = set()
-        for fpath in file_paths:
-            p = PurePosixPath(fpath)
-            if p.parts and p.parts[0] == d:
-                if len(p.parts) == 2:
-                    file_types[p.suffix or "(no_ext)"] += 1
-                elif len(p.parts) > 2:
-                    subdirs.add(p.parts[1])
-                    file_types[p.suffix or "(no_ext)"] += 1
+        file_types, subdirs = agg[d]
         lines.append("")
         lines.append(f"{d}/")
         if subdirs:
@@ -243,21 +286,14 @@ def _build_tree_summary(file_paths: list[str], max_lines: int) -> list[str]:
     return lines
 
 
-def build_directory_tree(files: list[RepoFile], max_lines: int = 150) -> str:
+def build_directory_tree(file_paths: list[str], max_lines: int = 150) -> str:
     """Build a compact directory tree representation."""
-    dirs: set[str] = set()
-    file_paths: list[str] = []
-
-    for f in files:
-        file_paths.append(f.path)
-        parts = PurePosixPath(f.path).parts
-        for i in range(1, len(parts)):
-            dirs.add("/".join(parts[:i]) + "/")
+    file_paths = sorted(file_paths)
 
-    if len(dirs) > 100:
+    if _count_directories(file_paths) > 100:
         lines = _build_tree_summary(file_paths, max_lines)
     else:
-        lines = _build_tree_full(dirs, file_paths, max_lines)
+        lines = _build_tree_full(file_paths, max_lines)
 
     return "\n".join(lines)
 
@@ -268,45 +304,137 @@ def truncate_content(content: str, max_chars: int = MAX_FILE_CHARS) -> str:
     return content[:max_chars] + "\n\n... [truncated]"
 
 
+async def _fetch_from_tarball(
+    client: GitHubClient,
+    owner: str,
+    repo: str,
+    branch: str,
+    to_fetch: list[RepoFile],
+) -> None:
+    """Fill file contents from one tarball download, if one is available.
+
+    Files not found in the archive (or on any failure) are simply left
+    without content for the per-file fallback to pick up.
+    """
+    data = await client.fetch_tarball(owner, repo, branch)
+    if data is None:
+        return
+    wanted = {f.path: f for f in to_fetch}
+
+    def _extract() -> dict[str, str]:
+        results: dict[str, str] = {}
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                # Member names carry a "<owner>-<repo>-<sha>/" prefix.
+                _, _, path = member.name.partition("/")
+                if path not in wanted:
+                    continue
+                fh = tar.extractfile(member)
+                if fh is None:
+                    continue
+                results[path] = fh.read().decode("utf-8", "replace")
+                if len(results) == len(wanted):
+                    break
+        return results
+
+    try:
+        # The gzip + tar decode is CPU work; keep it off the event loop.
+        results = await asyncio.to_thread(_extract)
+    except (tarfile.TarError, OSError, EOFError) as e:
+        logger.warning("Failed to read tarball for %s/%s: %s", owner, repo, e)
+        return
+    for path, text in results.items():
+        wanted[path].content = text
+
+
+async def _fetch_contents(client: GitHubClient, to_fetch: list[RepoFile]) -> None:
+    """Download file contents with a fixed pool of worker tasks.
+
+    A bounded pool pulling from a queue bounds concurrency at a single
+    chokepoint instead of creating one task per file up-front.
+    """
+    queue: asyncio.Queue[RepoFile] = asyncio.Queue()
+    for f in to_fetch:
+        queue.put_nowait(f)
+
+    async def _worker():
+        while True:
+            f = await queue.get()
+            try:
+                logger.debug("Fetching file content: %s", f.path)
+                content = await client.fetch_file_content(f)
+                if content is not None:
+                    f.content = content
+            finally:
+                queue.task_done()
+
+    workers = [
+        asyncio.create_task(_worker())
+        for _ in range(min(FETCH_WORKERS, len(to_fetch)))
+    ]
+    try:
+        await queue.join()
+    finally:
+        for w in workers:
+            w.cancel()
+
+
 async def collect_repo_context(
     client: GitHubClient,
+    owner: str,
+    repo: str,
+    branch: str,
     files: list[RepoFile],
 ) -> str:
     """Fetch file contents and assemble the context string for the LLM."""
-    prioritized = filter_files(files)
-    to_fetch = prioritized[:MAX_FILES_TO_FETCH]
-
-    semaphore = asyncio.Semaphore(10)
-
-    async def _fetch(f: RepoFile):
-        async with semaphore:
-            logger.debug("Fetching file content: %s", f.path)
-            content = await client.fetch_file_content(f)
-            if content is not None:
-                f.content = content
-
-    await asyncio.gather(*[_fetch(f) for f in to_fetch])
-
-    tree = build_directory_tree(files)
-    parts: list[str] = [f"## Directory Structure\n```\n{tree}\n```\n"]
-    total_chars = len(parts[0])
+    to_fetch, file_paths = analyze_files(files, top_k=MAX_FILES_TO_FETCH)
+
+    if len(to_fetch) > TARBALL_MIN_FILES:
+        await _fetch_from_tarball(client, owner, repo, branch, to_fetch)
+    missing = [f for f in to_fetch if f.content is None]
+    if missing:
+        await _fetch_contents(client, missing)
+
+    tree_key = hashlib.sha1("\0".join(file_paths).encode()).digest()
+    tree = _TREE_CACHE.get(tree_key)
+    if tree is None:
+        tree = build_directory_tree(file_paths)
+        _TREE_CACHE.put(tree_key, tree)
+    # Write straight into one buffer with a shrinking budget instead of
+    # collecting sections in a list and joining a second full-size copy.
+    buf = io.StringIO()
+    buf.write(f"## Directory Structure\n```\n{tree}\n```\n")
+    remaining = MAX_CONTEXT_CHARS - buf.tell()
+
+    # Per-section markdown overhead ("\n## File: ...\n```\n...\n```\n").
+    section_overhead = 20
 
     for f in to_fetch:
         if f.content is None:
             continue
+        # Size the section before building it: once the budget is nearly
+        # spent this avoids allocating a ~15k-char string per remaining
+        # file just to discard it.
+        content_len = len(f.content)
+        if content_len > MAX_FILE_CHARS:
+            # truncate_content appends "\n\n... [truncated]".
+            content_len = MAX_FILE_CHARS + 17
+        section_len = content_len + len(f.path) + section_overhead
+        if section_len > remaining:
+            if remaining > 500:
+                content = truncate_content(f.content)
+                buf.write(
+                    f"\n## File: {f.path}\n"
+                    f"```\n{content[:remaining - 200]}\n... [truncated]\n```\n"
+                )
+            break
         content = truncate_content(f.content)
-        section = (
-            f"## File: {f.path}\n"
+        buf.write(
+            f"\n## File: {f.path}\n"
             f"```\n{content}\n```\n"
         )
+        remaining -= section_len
 
-        if total_chars + len(section) > MAX_CONTEXT_CHARS:
-            remaining = MAX_CONTEXT_CHARS - total_chars
-            if remaining > 500:
-                section = f"## File: {f.path}\n```\n{content[:remaining - 200]}\n... [truncated]\n```\n"
-                parts.append(section)
-            break
-        parts.append(section)
-        total_chars += len(section)
-
-    return "\n".join(parts)
+    return buf.getvalue()